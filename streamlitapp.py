@@ -1,57 +1,59 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import numpy as np
 import io
-import requests
-import json
+import hashlib
 import os # For environment variables, though Streamlit secrets are preferred
 
+try:
+    import orjson # Optional: faster JSON encoding/decoding for the Gemini API call
+except ImportError:
+    orjson = None
+
 # --- Streamlit Page Configuration ---
 st.set_page_config(layout="wide", page_title="Interactive Media Intelligence", page_icon="📊")
 
 # --- Title and Header ---
-st.markdown(
-    """
-    <style>
-    .big-font {
-        font-size:3rem !important;
-        font-weight: bold;
-        text-align: center;
-        color: #1E40AF; /* blue-700 */
-        margin-bottom: 1.5rem;
-        padding: 0.5rem;
-        border-radius: 0.75rem;
-    }
-    .stSpinner > div > div {
-        color: #2563EB; /* blue-600 */
-    }
-    .streamlit-expanderHeader {
-        background-color: #DBEAFE; /* blue-50 */
-        color: #1E40AF; /* blue-700 */
-        border-radius: 0.75rem;
-        padding: 1rem;
-        font-weight: 600;
-        font-size: 1.25rem;
-    }
-    .stSelectbox, .stDateInput, .stTextInput {
-        border-radius: 0.5rem;
-    }
-    .stButton>button {
-        border-radius: 0.5rem;
-        padding: 0.75rem 1.5rem;
-        font-weight: 600;
-        transition: all 0.15s ease-in-out;
-    }
-    .stButton>button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-
-st.markdown('<p class="big-font">Interactive Media Intelligence</p>', unsafe_allow_html=True)
+# Static stylesheet, sent together with the title in a single markdown element
+CUSTOM_CSS = """
+<style>
+.big-font {
+    font-size:3rem !important;
+    font-weight: bold;
+    text-align: center;
+    color: #1E40AF; /* blue-700 */
+    margin-bottom: 1.5rem;
+    padding: 0.5rem;
+    border-radius: 0.75rem;
+}
+.stSpinner > div > div {
+    color: #2563EB; /* blue-600 */
+}
+.streamlit-expanderHeader {
+    background-color: #DBEAFE; /* blue-50 */
+    color: #1E40AF; /* blue-700 */
+    border-radius: 0.75rem;
+    padding: 1rem;
+    font-weight: 600;
+    font-size: 1.25rem;
+}
+.stSelectbox, .stDateInput, .stTextInput {
+    border-radius: 0.5rem;
+}
+.stButton>button {
+    border-radius: 0.5rem;
+    padding: 0.75rem 1.5rem;
+    font-weight: 600;
+    transition: all 0.15s ease-in-out;
+}
+.stButton>button:hover {
+    transform: translateY(-2px);
+    box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
+}
+</style>
+"""
+
+st.markdown(CUSTOM_CSS + '<p class="big-font">Interactive Media Intelligence</p>', unsafe_allow_html=True)
 
 # --- LLM API Key Configuration ---
 # IMPORTANT: For deployment, use Streamlit Secrets (st.secrets)
@@ -60,70 +62,328 @@ st.markdown('<p class="big-font">Interactive Media Intelligence</p>', unsafe_all
 # Example: GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "YOUR_GEMINI_API_KEY_HERE")
 GEMINI_API_KEY = "" # Leave this empty. Canvas will inject the API key at runtime.
 
-# --- File Upload Section ---
-st.markdown(
+@st.cache_resource # Reuse one HTTP session (and its Keep-Alive connection) across reruns
+def get_session():
+    """
+    Returns a shared requests.Session so repeated API calls skip the TCP/TLS handshake.
+    """
+    import requests # Imported lazily; only needed once a summary is requested
+
+    session = requests.Session()
+    session.headers.update({'Content-Type': 'application/json'})
+    return session
+
+# Campaign summary prompt, filled with str.format on each request
+PROMPT_TEMPLATE = """
+Berdasarkan data intelijen media berikut, berikan ringkasan strategi kampanye (ringkasan tindakan utama) yang ringkas dalam bahasa Indonesia.
+Fokus pada wawasan yang dapat ditindaklanjuti.
+
+Poin data:
+- Rentang Tanggal Data: {date_range_text}
+- Total Keterlibatan: {total_engagements}
+- Pecahan Sentimen: {sentiment_counts}
+- Platform Teratas berdasarkan Keterlibatan: {platform_engagements}
+- Jenis Media Teratas: {media_type_counts}
+- Lokasi Teratas: {location_counts}
+
+Sajikan ringkasan ini dalam format naratif yang mudah dibaca, menyoroti rekomendasi atau poin tindakan utama.
+"""
+
+def dumps_text(obj):
+    """
+    Serializes obj to a JSON string for the prompt, keeping non-ASCII characters as-is.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    import json
+    return json.dumps(obj, ensure_ascii=False)
+
+def stream_summary_text(response):
+    """
+    Yields the text deltas of a Gemini streamGenerateContent (alt=sse) response
+    as they arrive, for st.write_stream.
     """
-    <div style="background-color: #DBEAFE; /* blue-50 */
-                padding: 1.5rem;
-                border-radius: 0.75rem;
-                box-shadow: inset 0 2px 4px 0 rgba(0, 0, 0, 0.06);">
-        <h3 style="color: #4B5563; /* gray-700 */ margin-bottom: 0.75rem;">Unggah File CSV</h3>
-    """,
-    unsafe_allow_html=True
-)
-uploaded_file = st.file_uploader("", type="csv", help="Unggah file CSV Anda di sini.")
-st.markdown('</div>', unsafe_allow_html=True)
+    import json
+
+    loads = orjson.loads if orjson is not None else json.loads
+    for line in response.iter_lines():
+        # Each SSE event is a 'data: {...}' line holding one GenerateContentResponse
+        if not line.startswith(b'data:'):
+            continue
+        chunk = loads(line[len(b'data:'):])
+        candidates = chunk.get('candidates') or []
+        parts = (candidates[0].get('content') or {}).get('parts') if candidates else None
+        if parts and parts[0].get('text'):
+            yield parts[0]['text']
+
+# --- File Upload Section ---
+with st.container(border=True):
+    st.subheader(":gray[Unggah File CSV]")
+    uploaded_file = st.file_uploader("", type="csv", help="Unggah file CSV Anda di sini.")
 
 
 # --- Data Processing and Cleaning ---
-@st.cache_data # Cache data to avoid reprocessing on each rerun
-def process_data(file_content):
+CATEGORICAL_COLS = ['Platform', 'Sentiment', 'Media Type', 'Location']
+EXPECTED_COLS = ['Date', 'Engagements'] + CATEGORICAL_COLS
+
+@st.cache_resource(max_entries=4) # Keep the processed DataFrame in memory; no pickling on each rerun
+def process_data(file_hash, _file_content):
     """
     Reads CSV, cleans data, and prepares it for analysis.
+    Cached by file_hash (md5 of the upload) so Streamlit doesn't re-hash the raw bytes.
+    The returned DataFrame is shared across reruns and sessions: callers must not mutate it.
     - Converts 'Date' to datetime objects.
     - Fills empty 'Engagements' with 0 and converts to int.
-    - Fills missing categorical data with 'Unknown'.
+    - Fills missing categorical data with 'Unknown' and stores it as Categorical.
     - Drops rows with invalid dates.
-    - Sorts data by date.
     """
     try:
-        # Read CSV content into a DataFrame
-        df = pd.read_csv(io.StringIO(file_content.decode('utf-8')))
+        # Read CSV bytes directly, parsing only the columns we use and
+        # reading categorical columns straight into Categorical
+        # (integer codes plus one small set of labels, so no per-row string
+        # objects; preferred over Arrow-backed strings, which would compare
+        # and group on the string values themselves)
+        df = pd.read_csv(
+            io.BytesIO(_file_content),
+            usecols=lambda col: col in EXPECTED_COLS,
+            dtype={col: 'category' for col in CATEGORICAL_COLS}
+        )
 
         # Data cleaning: Convert 'Date' to datetime
         # errors='coerce' will turn unparseable dates into NaT (Not a Time)
         df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
 
         # Fill empty 'Engagements' with 0 and convert to integer
-        # First, convert to numeric, coercing errors to NaN, then fill and convert to Int64 (supports NaNs)
-        df['Engagements'] = pd.to_numeric(df['Engagements'], errors='coerce').fillna(0).astype(int)
+        # The parser already yields int64 (or float64 with NaNs) for clean numeric columns,
+        # so only coerce non-numeric text and fill NaNs when actually needed
+        engagements = df['Engagements']
+        if not pd.api.types.is_numeric_dtype(engagements):
+            engagements = pd.to_numeric(engagements, errors='coerce')
+        if engagements.hasnans:
+            engagements = engagements.fillna(0)
+        df['Engagements'] = engagements.astype('int64')
 
         # Fill missing values in categorical columns with 'Unknown'
-        categorical_cols = ['Platform', 'Sentiment', 'Media Type', 'Location']
-        for col in categorical_cols:
-            if col in df.columns:
-                df[col].fillna('Unknown', inplace=True)
-            else:
-                df[col] = 'Unknown' # Add column if not present
+        present_cols = [col for col in CATEGORICAL_COLS if col in df.columns]
+        missing_cols = [col for col in CATEGORICAL_COLS if col not in df.columns]
+        # 'Unknown' must be a category of every column passed to the fillna dict,
+        # even ones without NaNs; unused categories are dropped after the date filter
+        for col in present_cols:
+            if 'Unknown' not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories('Unknown')
+        df = df.fillna({col: 'Unknown' for col in present_cols})
+        # Add columns if not present, as an all-'Unknown' Categorical
+        df = df.assign(**{
+            col: pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), categories=['Unknown'])
+            for col in missing_cols
+        })
 
         # Filter out rows with invalid dates (NaT)
         df.dropna(subset=['Date'], inplace=True)
+        # Drop labels that only occurred on those rows, so filter options match the data
+        for col in CATEGORICAL_COLS:
+            df[col] = df[col].cat.remove_unused_categories()
 
-        # Create DateString for grouping and display
-        df['DateString'] = df['Date'].dt.strftime('%Y-%m-%d')
+        # Date part as datetime64[D] for date filtering and daily grouping,
+        # taken in the column's own timezone (.values would convert to UTC)
+        local_dates = df['Date'].dt.tz_localize(None) if df['Date'].dt.tz is not None else df['Date']
+        df['DateOnly'] = local_dates.values.astype('datetime64[D]')
 
-        # Sort data by Date for engagement trend
-        df.sort_values(by='Date', inplace=True)
+        # Identifies this df in the cache keys of the filter/aggregation functions
+        df.attrs['file_hash'] = file_hash
 
         return df
     except Exception as e:
         st.error(f"Gagal memproses data: {e}. Harap pastikan format CSV Anda benar dan berisi kolom yang diharapkan.")
         return pd.DataFrame() # Return empty DataFrame on error
 
+# The processed df is read-only and tagged with its file hash, so it is hashed
+# by that tag instead of by content.
+DF_HASH_FUNCS = {pd.DataFrame: lambda df: df.attrs['file_hash']}
+
+@st.cache_data(hash_funcs=DF_HASH_FUNCS) # Cache filter options per uploaded file
+def get_filter_options(df):
+    """
+    Returns the selectbox options for each categorical filter column,
+    read from the Categorical categories instead of scanning with unique().
+    """
+    return {col: ['All'] + df[col].cat.categories.tolist()
+            for col in CATEGORICAL_COLS}
+
+def observed_counts(series):
+    """
+    value_counts() for a Categorical column, dropping categories that
+    don't occur in the (filtered) data.
+    """
+    counts = series.value_counts()
+    return counts[counts > 0]
+
+# --- Filtering and Aggregations ---
+@st.cache_resource(max_entries=8, hash_funcs=DF_HASH_FUNCS)
+def filter_data(df, filter_key):
+    """
+    Applies the filter selections as a single boolean mask.
+    filter_key is (platform, sentiment, media_type, location, start_date, end_date).
+    """
+    platform, sentiment, media_type, location, start_date, end_date = filter_key
+
+    conds = []
+    if platform != 'All':
+        conds.append(df['Platform'].values == platform)
+    if sentiment != 'All':
+        conds.append(df['Sentiment'].values == sentiment)
+    if media_type != 'All':
+        conds.append(df['Media Type'].values == media_type)
+    if location != 'All':
+        conds.append(df['Location'].values == location)
+
+    # Date range filter
+    date_only = df['DateOnly'].values
+    if start_date:
+        start64 = np.datetime64(start_date)
+        conds.append(date_only >= start64)
+    if end_date:
+        end64 = np.datetime64(end_date)
+        conds.append(date_only <= end64)
+
+    # Downstream code only reads the result, so no copy is needed without filters
+    if not conds:
+        return df
+    return df.loc[np.logical_and.reduce(conds)]
+
+@st.cache_data(max_entries=32, hash_funcs=DF_HASH_FUNCS)
+def agg_sentiment(df, filter_key):
+    """Sentiment counts for the filtered data."""
+    return observed_counts(filter_data(df, filter_key)['Sentiment'])
+
+@st.cache_data(max_entries=32, hash_funcs=DF_HASH_FUNCS)
+def agg_platform_engagement(df, filter_key):
+    """Total engagements per platform, highest first."""
+    filtered_df = filter_data(df, filter_key)
+    return filtered_df.groupby('Platform', observed=True, sort=False)['Engagements'].sum().sort_values(ascending=False)
+
+@st.cache_data(max_entries=32, hash_funcs=DF_HASH_FUNCS)
+def agg_media(df, filter_key):
+    """Media type counts for the filtered data."""
+    return observed_counts(filter_data(df, filter_key)['Media Type'])
+
+@st.cache_data(max_entries=32, hash_funcs=DF_HASH_FUNCS)
+def agg_locations(df, filter_key):
+    """Location counts for the filtered data, highest first."""
+    return observed_counts(filter_data(df, filter_key)['Location'])
+
+@st.cache_data(max_entries=32, hash_funcs=DF_HASH_FUNCS)
+def agg_daily_engagement(df, filter_key):
+    """Total engagements per day."""
+    # Keyed on datetime64 values; kept sorted because px.line draws points in row order
+    return filter_data(df, filter_key).groupby('DateOnly', sort=True)['Engagements'].sum()
+
+# --- Chart Builders ---
+# Figures are cached on the aggregated (labels, values) tuples, so reruns with
+# unchanged data skip Plotly figure construction.
+def to_labels_values(series):
+    """
+    Converts an aggregated Series into hashable (labels, values) tuples.
+    """
+    return tuple(series.index.tolist()), tuple(series.tolist())
+
+@st.cache_data(max_entries=32)
+def make_sentiment_fig(labels, values):
+    """Pie chart of the sentiment breakdown."""
+    import plotly.express as px # Imported lazily; Plotly is slow to import and only needed for charts
+
+    sentiment_counts = pd.DataFrame({'Sentiment': labels, 'Count': values})
+    fig_sentiment = px.pie(
+        sentiment_counts,
+        values='Count',
+        names='Sentiment',
+        title='Pecahan Sentimen',
+        hole=0.4,
+        color='Sentiment',
+        color_discrete_map={
+            'Positive': '#4CAF50', # Green
+            'Negative': '#F44336', # Red
+            'Neutral': '#2196F3',  # Blue
+            'Unknown': '#9E9E9E'   # Grey
+        }
+    )
+    fig_sentiment.update_traces(textinfo='percent+label', marker=dict(line=dict(color='#FFFFFF', width=1)))
+    fig_sentiment.update_layout(height=400, margin=dict(t=40, b=40, l=40, r=40), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(family='Inter, sans-serif'))
+    return fig_sentiment
+
+@st.cache_data(max_entries=32)
+def make_engagement_trend_fig(labels, values):
+    """Line chart of total engagements per day."""
+    import plotly.express as px
+
+    daily_engagements = pd.DataFrame({'Date': labels, 'Total Engagements': values})
+    fig_engagement_trend = px.line(
+        daily_engagements,
+        x='Date',
+        y='Total Engagements',
+        title='Tren Keterlibatan Seiring Waktu',
+        markers=True,
+        line_shape="linear",
+        color_discrete_sequence=['#3F51B5'] # Indigo-500
+    )
+    fig_engagement_trend.update_layout(height=400, margin=dict(t=40, b=60, l=60, r=40), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(family='Inter, sans-serif'), xaxis_title='Tanggal', yaxis_title='Total Keterlibatan')
+    return fig_engagement_trend
+
+@st.cache_data(max_entries=32)
+def make_platform_fig(labels, values):
+    """Bar chart of total engagements per platform."""
+    import plotly.express as px
+
+    platform_engagements = pd.DataFrame({'Platform': labels, 'Engagements': values})
+    fig_platform = px.bar(
+        platform_engagements,
+        x='Platform',
+        y='Engagements',
+        title='Keterlibatan Platform',
+        color_discrete_sequence=['#0EA5E9'] # Sky-600
+    )
+    fig_platform.update_layout(height=400, margin=dict(t=40, b=60, l=60, r=40), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(family='Inter, sans-serif'), xaxis_title='Platform', yaxis_title='Total Keterlibatan')
+    return fig_platform
+
+@st.cache_data(max_entries=32)
+def make_media_type_fig(labels, values):
+    """Pie chart of the media type mix."""
+    import plotly.express as px
+
+    media_type_counts = pd.DataFrame({'Media Type': labels, 'Count': values})
+    fig_media_type = px.pie(
+        media_type_counts,
+        values='Count',
+        names='Media Type',
+        title='Campuran Jenis Media',
+        hoverinfo='label+percent',
+        color_discrete_sequence=px.colors.sequential.Bluyl
+    )
+    fig_media_type.update_traces(textinfo='percent+label', marker=dict(line=dict(color='#FFFFFF', width=1)))
+    fig_media_type.update_layout(height=400, margin=dict(t=40, b=40, l=40, r=40), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(family='Inter, sans-serif'))
+    return fig_media_type
+
+@st.cache_data(max_entries=32)
+def make_locations_fig(labels, values):
+    """Bar chart of the top locations."""
+    import plotly.express as px
+
+    location_counts = pd.DataFrame({'Location': labels, 'Count': values})
+    fig_locations = px.bar(
+        location_counts,
+        x='Location',
+        y='Count',
+        title='5 Lokasi Teratas',
+        color_discrete_sequence=['#14B8A6'] # Teal-500
+    )
+    fig_locations.update_layout(height=400, margin=dict(t=40, b=60, l=60, r=40), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(family='Inter, sans-serif'), xaxis_title='Lokasi', yaxis_title='Jumlah')
+    return fig_locations
+
 df = pd.DataFrame()
 if uploaded_file is not None:
     with st.spinner("Memproses data..."):
-        df = process_data(uploaded_file.read())
+        file_content = uploaded_file.getvalue()
+        df = process_data(hashlib.md5(file_content).hexdigest(), file_content)
 
 if df.empty and uploaded_file is not None:
     st.warning("Tidak ada data yang valid untuk ditampilkan setelah pemrosesan. Harap periksa file CSV Anda.")
@@ -133,138 +393,95 @@ elif df.empty and uploaded_file is None:
 
 # --- Filters Section ---
 if not df.empty:
-    st.markdown(
-        """
-        <div style="background-color: #DBEAFE; /* blue-50 */
-                    padding: 1.5rem;
-                    border-radius: 0.75rem;
-                    box-shadow: inset 0 2px 4px 0 rgba(0, 0, 0, 0.06);
-                    margin-bottom: 2rem;">
-            <h3 style="color: #1E40AF; /* blue-700 */ margin-bottom: 1rem;">Filter Data</h3>
-        """,
-        unsafe_allow_html=True
-    )
-    col1, col2, col3 = st.columns(3)
-
-    # Collect unique values for filters
-    platforms = ['All'] + list(df['Platform'].unique())
-    sentiments = ['All'] + list(df['Sentiment'].unique())
-    media_types = ['All'] + list(df['Media Type'].unique())
-    locations = ['All'] + list(df['Location'].unique())
-
-    with col1:
-        selected_platform = st.selectbox("Platform", platforms)
-        selected_sentiment = st.selectbox("Sentimen", sentiments)
-    with col2:
-        selected_media_type = st.selectbox("Jenis Media", media_types)
-        selected_location = st.selectbox("Lokasi", locations)
-    with col3:
-        min_date = df['Date'].min().to_pydatetime().date()
-        max_date = df['Date'].max().to_pydatetime().date()
-
-        start_date = st.date_input("Tanggal Mulai", min_value=min_date, max_value=max_date, value=min_date)
-        end_date = st.date_input("Tanggal Akhir", min_value=min_date, max_value=max_date, value=max_date)
+    with st.container(border=True):
+        st.subheader(":blue[Filter Data]")
+        col1, col2, col3 = st.columns(3)
+
+        # Collect unique values for filters
+        filter_options = get_filter_options(df)
+        platforms = filter_options['Platform']
+        sentiments = filter_options['Sentiment']
+        media_types = filter_options['Media Type']
+        locations = filter_options['Location']
+
+        with col1:
+            selected_platform = st.selectbox("Platform", platforms, key="flt_platform")
+            selected_sentiment = st.selectbox("Sentimen", sentiments, key="flt_sentiment")
+        with col2:
+            selected_media_type = st.selectbox("Jenis Media", media_types, key="flt_media_type")
+            selected_location = st.selectbox("Lokasi", locations, key="flt_location")
+        with col3:
+            min_date = df['Date'].min().to_pydatetime().date()
+            max_date = df['Date'].max().to_pydatetime().date()
+
+            start_date = st.date_input("Tanggal Mulai", min_value=min_date, max_value=max_date, value=min_date)
+            end_date = st.date_input("Tanggal Akhir", min_value=min_date, max_value=max_date, value=max_date)
 
     # Apply filters to create filtered_df
-    filtered_df = df.copy()
-
-    if selected_platform != 'All':
-        filtered_df = filtered_df[filtered_df['Platform'] == selected_platform]
-    if selected_sentiment != 'All':
-        filtered_df = filtered_df[filtered_df['Sentiment'] == selected_sentiment]
-    if selected_media_type != 'All':
-        filtered_df = filtered_df[filtered_df['Media Type'] == selected_media_type]
-    if selected_location != 'All':
-        filtered_df = filtered_df[filtered_df['Location'] == selected_location]
+    filter_key = (selected_platform, selected_sentiment, selected_media_type,
+                  selected_location, start_date, end_date)
+    filtered_df = filter_data(df, filter_key)
 
-    # Date range filter
-    if start_date and end_date:
-        filtered_df = filtered_df[(filtered_df['Date'].dt.date >= start_date) & (filtered_df['Date'].dt.date <= end_date)]
-    elif start_date:
-        filtered_df = filtered_df[filtered_df['Date'].dt.date >= start_date]
-    elif end_date:
-        filtered_df = filtered_df[filtered_df['Date'].dt.date <= end_date]
-
-    st.markdown('</div>', unsafe_allow_html=True)
+    # Aggregate once per rerun; shared by the summary prompt and the charts
+    sentiment_vc = agg_sentiment(df, filter_key)
+    media_vc = agg_media(df, filter_key)
+    location_vc = agg_locations(df, filter_key)
+    platform_eng = agg_platform_engagement(df, filter_key)
 
 
     # --- Campaign Strategy Summary Section ---
-    st.markdown(
-        """
-        <div style="background-color: #EEF2FF; /* indigo-50 */
-                    padding: 1.5rem;
-                    border-radius: 0.75rem;
-                    box-shadow: inset 0 2px 4px 0 rgba(0, 0, 0, 0.06);
-                    margin-bottom: 2rem;">
-            <h3 style="color: #3730A3; /* indigo-700 */ margin-bottom: 1rem;">Ringkasan Strategi Kampanye</h3>
-        """,
-        unsafe_allow_html=True
-    )
-    if st.button("Hasilkan Ringkasan", key="generate_summary_btn"):
-        if filtered_df.empty:
-            st.warning("Tidak ada data untuk menghasilkan ringkasan. Harap sesuaikan filter Anda.")
-        else:
-            with st.spinner("Menghasilkan ringkasan..."):
-                # Aggregate data for the prompt
-                sentiment_counts = filtered_df['Sentiment'].value_counts().to_dict()
-                platform_engagements = filtered_df.groupby('Platform')['Engagements'].sum().nlargest(3).to_dict()
-                media_type_counts = filtered_df['Media Type'].value_counts().nlargest(3).to_dict()
-                location_counts = filtered_df['Location'].value_counts().nlargest(3).to_dict()
-                total_engagements = filtered_df['Engagements'].sum()
-
-                min_date_summary = filtered_df['Date'].min().strftime('%Y-%m-%d')
-                max_date_summary = filtered_df['Date'].max().strftime('%Y-%m-%d')
-                date_range_text = f"{min_date_summary} - {max_date_summary}"
-
-
-                prompt = f"""
-                    Berdasarkan data intelijen media berikut, berikan ringkasan strategi kampanye (ringkasan tindakan utama) yang ringkas dalam bahasa Indonesia.
-                    Fokus pada wawasan yang dapat ditindaklanjuti.
-
-                    Poin data:
-                    - Rentang Tanggal Data: {date_range_text}
-                    - Total Keterlibatan: {total_engagements}
-                    - Pecahan Sentimen: {json.dumps(sentiment_counts, ensure_ascii=False)}
-                    - Platform Teratas berdasarkan Keterlibatan: {json.dumps(platform_engagements, ensure_ascii=False)}
-                    - Jenis Media Teratas: {json.dumps(media_type_counts, ensure_ascii=False)}
-                    - Lokasi Teratas: {json.dumps(location_counts, ensure_ascii=False)}
-
-                    Sajikan ringkasan ini dalam format naratif yang mudah dibaca, menyoroti rekomendasi atau poin tindakan utama.
-                """
-
-                chat_history = []
-                chat_history.append({"role": "user", "parts": [{"text": prompt}]})
-                payload = {"contents": chat_history}
-
-                api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
-
-                try:
-                    response = requests.post(api_url, headers={'Content-Type': 'application/json'}, data=json.dumps(payload))
-                    response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-                    result = response.json()
-
-                    if result and result.get('candidates') and len(result['candidates']) > 0 and \
-                       result['candidates'][0].get('content') and result['candidates'][0]['content'].get('parts') and \
-                       len(result['candidates'][0]['content']['parts']) > 0:
-                        campaign_summary = result['candidates'][0]['content']['parts'][0]['text']
-                        st.markdown(
-                            f"""
-                            <div style="margin-top: 1rem; padding: 1rem; background-color: #EEF2FF; /* indigo-100 */
-                                        border: 1px solid #6366F1; /* indigo-400 */
-                                        border-radius: 0.5rem;">
-                                <p style="white-space: pre-wrap; color: #374151; /* gray-800 */">{campaign_summary}</p>
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
-                    else:
-                        st.error("Gagal menghasilkan ringkasan. Tidak ada respons yang valid dari API.")
-                        st.json(result) # Display raw API response for debugging
-                except requests.exceptions.RequestException as e:
-                    st.error(f"Terjadi kesalahan saat memanggil API Gemini: {e}. Harap periksa kunci API Anda dan koneksi internet.")
-                except Exception as e:
-                    st.error(f"Terjadi kesalahan yang tidak terduga: {e}")
-    st.markdown('</div>', unsafe_allow_html=True)
+    with st.container(border=True):
+        st.subheader(":violet[Ringkasan Strategi Kampanye]")
+        if st.button("Hasilkan Ringkasan", key="generate_summary_btn"):
+            if filtered_df.empty:
+                st.warning("Tidak ada data untuk menghasilkan ringkasan. Harap sesuaikan filter Anda.")
+            else:
+                import requests # Imported lazily so reruns that only touch filters skip it
+
+                with st.spinner("Menghasilkan ringkasan..."):
+                    # Aggregate data for the prompt
+                    sentiment_counts = sentiment_vc.to_dict()
+                    platform_engagements = platform_eng.head(3).to_dict()
+                    media_type_counts = media_vc.head(3).to_dict()
+                    location_counts = location_vc.head(3).to_dict()
+                    total_engagements = filtered_df['Engagements'].sum()
+
+                    min_date_summary = filtered_df['Date'].min().strftime('%Y-%m-%d')
+                    max_date_summary = filtered_df['Date'].max().strftime('%Y-%m-%d')
+                    date_range_text = f"{min_date_summary} - {max_date_summary}"
+
+                    prompt = PROMPT_TEMPLATE.format(
+                        date_range_text=date_range_text,
+                        total_engagements=total_engagements,
+                        sentiment_counts=dumps_text(sentiment_counts),
+                        platform_engagements=dumps_text(platform_engagements),
+                        media_type_counts=dumps_text(media_type_counts),
+                        location_counts=dumps_text(location_counts)
+                    )
+
+                    chat_history = []
+                    chat_history.append({"role": "user", "parts": [{"text": prompt}]})
+                    payload = {"contents": chat_history}
+
+                    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
+
+                    try:
+                        if orjson is not None:
+                            response = get_session().post(api_url, data=orjson.dumps(payload), timeout=30, stream=True)
+                        else:
+                            response = get_session().post(api_url, json=payload, timeout=30, stream=True)
+                        with response:
+                            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+                            # Render the summary progressively as tokens arrive
+                            with st.container(border=True):
+                                campaign_summary = st.write_stream(stream_summary_text(response))
+
+                        if not campaign_summary:
+                            st.error("Gagal menghasilkan ringkasan. Tidak ada respons yang valid dari API.")
+                    except requests.exceptions.RequestException as e:
+                        st.error(f"Terjadi kesalahan saat memanggil API Gemini: {e}. Harap periksa kunci API Anda dan koneksi internet.")
+                    except Exception as e:
+                        st.error(f"Terjadi kesalahan yang tidak terduga: {e}")
 
     # --- Data Visualizations ---
     if not filtered_df.empty:
@@ -275,88 +492,30 @@ if not df.empty:
 
         with chart_col1:
             # Pie Chart: Sentiment Breakdown
-            sentiment_counts = filtered_df['Sentiment'].value_counts().reset_index()
-            sentiment_counts.columns = ['Sentiment', 'Count']
-            fig_sentiment = px.pie(
-                sentiment_counts,
-                values='Count',
-                names='Sentiment',
-                title='Pecahan Sentimen',
-                hole=0.4,
-                color='Sentiment',
-                color_discrete_map={
-                    'Positive': '#4CAF50', # Green
-                    'Negative': '#F44336', # Red
-                    'Neutral': '#2196F3',  # Blue
-                    'Unknown': '#9E9E9E'   # Grey
-                }
-            )
-            fig_sentiment.update_traces(textinfo='percent+label', marker=dict(line=dict(color='#FFFFFF', width=1)))
-            fig_sentiment.update_layout(height=400, margin=dict(t=40, b=40, l=40, r=40), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(family='Inter, sans-serif'))
+            fig_sentiment = make_sentiment_fig(*to_labels_values(sentiment_vc))
             st.plotly_chart(fig_sentiment, use_container_width=True)
 
         with chart_col2:
             # Line Chart: Engagement Trend over Time
-            daily_engagements = filtered_df.groupby('DateString')['Engagements'].sum().reset_index()
-            daily_engagements.columns = ['Date', 'Total Engagements']
-            fig_engagement_trend = px.line(
-                daily_engagements,
-                x='Date',
-                y='Total Engagements',
-                title='Tren Keterlibatan Seiring Waktu',
-                markers=True,
-                line_shape="linear",
-                color_discrete_sequence=['#3F51B5'] # Indigo-500
-            )
-            fig_engagement_trend.update_layout(height=400, margin=dict(t=40, b=60, l=60, r=40), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(family='Inter, sans-serif'), xaxis_title='Tanggal', yaxis_title='Total Keterlibatan')
+            fig_engagement_trend = make_engagement_trend_fig(*to_labels_values(agg_daily_engagement(df, filter_key)))
             st.plotly_chart(fig_engagement_trend, use_container_width=True)
 
         chart_col3, chart_col4 = st.columns(2)
         with chart_col3:
             # Bar Chart: Platform Engagements
-            platform_engagements = filtered_df.groupby('Platform')['Engagements'].sum().reset_index()
-            platform_engagements = platform_engagements.sort_values(by='Engagements', ascending=False)
-            fig_platform = px.bar(
-                platform_engagements,
-                x='Platform',
-                y='Engagements',
-                title='Keterlibatan Platform',
-                color_discrete_sequence=['#0EA5E9'] # Sky-600
-            )
-            fig_platform.update_layout(height=400, margin=dict(t=40, b=60, l=60, r=40), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(family='Inter, sans-serif'), xaxis_title='Platform', yaxis_title='Total Keterlibatan')
+            fig_platform = make_platform_fig(*to_labels_values(platform_eng))
             st.plotly_chart(fig_platform, use_container_width=True)
 
         with chart_col4:
             # Pie Chart: Media Type Mix
-            media_type_counts = filtered_df['Media Type'].value_counts().reset_index()
-            media_type_counts.columns = ['Media Type', 'Count']
-            fig_media_type = px.pie(
-                media_type_counts,
-                values='Count',
-                names='Media Type',
-                title='Campuran Jenis Media',
-                hoverinfo='label+percent',
-                color_discrete_sequence=px.colors.sequential.Bluyl
-            )
-            fig_media_type.update_traces(textinfo='percent+label', marker=dict(line=dict(color='#FFFFFF', width=1)))
-            fig_media_type.update_layout(height=400, margin=dict(t=40, b=40, l=40, r=40), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(family='Inter, sans-serif'))
+            fig_media_type = make_media_type_fig(*to_labels_values(media_vc))
             st.plotly_chart(fig_media_type, use_container_width=True)
 
         st.markdown("<br>", unsafe_allow_html=True) # Add some space
 
         # Bar Chart: Top 5 Locations (full width)
-        location_counts = filtered_df['Location'].value_counts().nlargest(5).reset_index()
-        location_counts.columns = ['Location', 'Count']
-        fig_locations = px.bar(
-            location_counts,
-            x='Location',
-            y='Count',
-            title='5 Lokasi Teratas',
-            color_discrete_sequence=['#14B8A6'] # Teal-500
-        )
-        fig_locations.update_layout(height=400, margin=dict(t=40, b=60, l=60, r=40), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(family='Inter, sans-serif'), xaxis_title='Lokasi', yaxis_title='Jumlah')
+        fig_locations = make_locations_fig(*to_labels_values(location_vc.head(5)))
         st.plotly_chart(fig_locations, use_container_width=True)
 
     else:
         st.info("Tidak ada data yang cocok dengan filter yang diterapkan.")
-